@@ -23,32 +23,32 @@ class DataValidator:
         print("DATA VALIDATION REPORT")
         print("="*60)
         
+        # All checks in one round trip; the transaction aggregates share a single scan
+        self.cursor.execute("""
+            SELECT
+                COUNT(*),
+                (SELECT COUNT(*) FROM customers),
+                (SELECT COUNT(*) FROM products),
+                COUNT(*) FILTER (WHERE total_amount < 0),
+                MIN(transaction_date),
+                MAX(transaction_date),
+                SUM(total_amount)
+            FROM transactions
+        """)
+        tx_count, cust_count, prod_count, negative, min_date, max_date, total_revenue = self.cursor.fetchone()
+        
         # Check record counts
-        self.cursor.execute("SELECT COUNT(*) FROM transactions")
-        tx_count = self.cursor.fetchone()[0]
         print(f"\n✓ Total transactions: {tx_count:,}")
-        
-        self.cursor.execute("SELECT COUNT(*) FROM customers")
-        cust_count = self.cursor.fetchone()[0]
         print(f"✓ Total customers: {cust_count:,}")
-        
-        self.cursor.execute("SELECT COUNT(*) FROM products")
-        prod_count = self.cursor.fetchone()[0]
         print(f"✓ Total products: {prod_count:,}")
         
         # Check data quality
-        self.cursor.execute("SELECT COUNT(*) FROM transactions WHERE total_amount < 0")
-        negative = self.cursor.fetchone()[0]
         print(f"\n✓ Records with negative amounts: {negative}")
         
         # Check date range
-        self.cursor.execute("SELECT MIN(transaction_date), MAX(transaction_date) FROM transactions")
-        min_date, max_date = self.cursor.fetchone()
         print(f"✓ Date range: {min_date} to {max_date}")
         
         # Revenue summary
-        self.cursor.execute("SELECT SUM(total_amount) FROM transactions")
-        total_revenue = self.cursor.fetchone()[0]
         print(f"\n✓ Total revenue: ${total_revenue:,.2f}")
         
         print("\n" + "="*60)
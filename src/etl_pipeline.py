@@ -1,8 +1,15 @@
+import codecs
+import hashlib
+import io
+import json
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import psycopg2
-from psycopg2.extras import execute_batch
 from sqlalchemy import create_engine
 import logging
 import os
@@ -22,6 +29,11 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Cleaned data is cached here so reruns can skip extract + transform
+CACHE_DIR = 'data/cache'
+# Bump whenever extract/transform logic changes so older caches are rebuilt
+CACHE_VERSION = 1
+
 class EcommerceETL:
     """ETL pipeline for e-commerce analytics"""
     
@@ -35,7 +47,8 @@ class EcommerceETL:
         }
         self.engine = None
         self.conn = None
-        self.df_raw = None
+        self.reader = None
+        self.df_clean = None
         self.stats = {
             'rows_extracted': 0,
             'rows_after_cleaning': 0,
@@ -63,30 +76,42 @@ class EcommerceETL:
             self.stats['errors'].append(f"Connection error: {e}")
             return False
     
-    def extract(self, filepath: str) -> bool:
-        """Extract data from CSV"""
+    def extract(self, filepath: str, block_size: int = 64 << 20) -> bool:
+        """Open a streaming Arrow reader over the CSV (rows are streamed in transform)"""
         try:
             logger.info(f"Extracting data from {filepath}")
             
-            # Read CSV with appropriate dtypes
-            dtype_dict = {
-                'InvoiceNo': str,
-                'StockCode': str,
-                'Description': str,
-                'Quantity': int,
-                'InvoiceDate': str,
-                'UnitPrice': float,
-                'CustomerID': str,
-                'Country': str
+            # Read CSV with appropriate types (dates parsed in the same pass)
+            column_types = {
+                'InvoiceNo': pa.string(),
+                'StockCode': pa.string(),
+                'Description': pa.dictionary(pa.int32(), pa.string()),
+                'Quantity': pa.int64(),
+                'InvoiceDate': pa.timestamp('ns'),
+                'UnitPrice': pa.float64(),
+                'CustomerID': pa.float64(),  # nullable until missing IDs are dropped
+                'Country': pa.dictionary(pa.int32(), pa.string())
             }
-            
-            self.df_raw = pd.read_csv(filepath, dtype=dtype_dict, encoding='utf-8', encoding_errors='ignore')
-            self.stats['rows_extracted'] = len(self.df_raw)
-            
-            logger.info(f"✓ Extracted {len(self.df_raw):,} rows")
-            logger.info(f"  Columns: {self.df_raw.columns.tolist()}")
-            logger.info(f"  Date range: {self.df_raw['InvoiceDate'].min()} to {self.df_raw['InvoiceDate'].max()}")
-            logger.info(f"  Missing values:\n{self.df_raw.isnull().sum()}")
+            convert_options = pacsv.ConvertOptions(
+                column_types=column_types,
+                strings_can_be_null=True,  # empty fields are missing, as with read_csv
+                timestamp_parsers=[pacsv.ISO8601, '%m/%d/%Y %H:%M']
+            )
+            
+            # Drop undecodable bytes before Arrow validates the UTF-8
+            source = codecs.EncodedFile(open(filepath, 'rb'), 'utf-8', 'utf-8', errors='ignore')
+            
+            # Streaming reader keeps peak memory bounded by block_size, not file size
+            try:
+                reader = pacsv.open_csv(source, read_options=pacsv.ReadOptions(block_size=block_size), 
+                                        convert_options=convert_options)
+            except Exception:
+                # _iter_chunks owns closing the source only once the reader exists
+                source.close()
+                raise
+            self.reader = self._iter_chunks(reader, source)
+            
+            logger.info(f"✓ Opened reader ({block_size / 2**20:.0f} MB per chunk)")
             
             return True
         except Exception as e:
@@ -94,154 +119,292 @@ class EcommerceETL:
             self.stats['errors'].append(f"Extraction error: {e}")
             return False
     
+    def _iter_chunks(self, reader, source):
+        """Yield record batches as DataFrames, closing the source once exhausted"""
+        # Arrow strings stay Arrow-backed so string filters run as Arrow kernels
+        types_mapper = {pa.string(): pd.StringDtype('pyarrow')}.get
+        try:
+            for batch in reader:
+                yield batch.to_pandas(types_mapper=types_mapper)
+        finally:
+            source.close()
+    
+    def _clean_chunk(self, df: pd.DataFrame, removed: Dict) -> pd.DataFrame:
+        """Apply row-level cleaning and quality filters to one raw chunk"""
+        # 1. Remove duplicates (within the chunk; repeated across chunks after concat)
+        # Chunks are freshly built from Arrow batches, so dropping in place is safe
+        rows = len(df)
+        df.drop_duplicates(inplace=True)
+        removed['duplicates'] += rows - len(df)
+        
+        # 2. Handle missing values
+        # Drop rows without CustomerID (can't attribute sales)
+        rows = len(df)
+        df.dropna(subset=['CustomerID'], inplace=True)
+        removed['null_customer'] += rows - len(df)
+        
+        # Drop rows without Description
+        df.dropna(subset=['Description'], inplace=True)
+        
+        # 3. Data type conversions
+        df['CustomerID'] = df['CustomerID'].astype(int)
+        df['Quantity'] = pd.to_numeric(df['Quantity'], errors='coerce')
+        df['UnitPrice'] = pd.to_numeric(df['UnitPrice'], errors='coerce')
+        
+        # 4. Data quality filters (combined so the chunk is filtered once)
+        keep = (
+            # Remove cancelled orders (InvoiceNo starts with 'C')
+            ~df['InvoiceNo'].str.startswith('C', na=False)
+            # Remove negative quantities and prices
+            & (df['Quantity'] > 0) & (df['UnitPrice'] > 0)
+            # Remove outliers (quantity > 10000 likely data errors)
+            & (df['Quantity'] <= 10000)
+        )
+        df.drop(df.index[~keep], inplace=True)
+        
+        return df
+    
     def transform(self) -> bool:
         """Transform and clean data"""
         try:
             logger.info("Transforming data")
-            df = self.df_raw.copy()
-            initial_rows = len(df)
-            
-            # 1. Remove duplicates
-            df = df.drop_duplicates()
-            logger.info(f"  → Removed {initial_rows - len(df)} duplicate rows")
-            
-            # 2. Handle missing values
-            # Drop rows without CustomerID (can't attribute sales)
-            df = df.dropna(subset=['CustomerID'])
-            logger.info(f"  → Dropped {initial_rows - len(df)} rows with null CustomerID")
+            removed = {'duplicates': 0, 'null_customer': 0}
+            missing_values = None
+            date_min, date_max = None, None
+            cleaned_chunks = []
+            
+            # Missing-value profiling walks every cell, so only do it when debugging
+            profile_columns = logger.isEnabledFor(logging.DEBUG)
+            
+            # Stream raw chunks; only the cleaned rows are held in memory
+            for chunk in self.reader:
+                self.stats['rows_extracted'] += len(chunk)
+                if profile_columns:
+                    chunk_missing = chunk.isnull().sum()
+                    missing_values = chunk_missing if missing_values is None else missing_values + chunk_missing
+                chunk_min, chunk_max = chunk['InvoiceDate'].min(), chunk['InvoiceDate'].max()
+                date_min = chunk_min if date_min is None else min(date_min, chunk_min)
+                date_max = chunk_max if date_max is None else max(date_max, chunk_max)
+                
+                cleaned_chunks.append(self._clean_chunk(chunk, removed))
+            self.reader = None
+            
+            initial_rows = self.stats['rows_extracted']
+            logger.info(f"✓ Extracted {initial_rows:,} rows")
+            logger.info(f"  Date range: {date_min} to {date_max}")
+            if missing_values is not None:
+                logger.debug(f"  Columns: {missing_values.index.tolist()}")
+                logger.debug(f"  Missing values:\n{missing_values}")
+            
+            df = pd.concat(cleaned_chunks, ignore_index=True)
+            del cleaned_chunks
+            
+            # Duplicates that straddle chunk boundaries
+            rows = len(df)
+            df.drop_duplicates(inplace=True)
+            removed['duplicates'] += rows - len(df)
+            
+            logger.info(f"  → Removed {removed['duplicates']} duplicate rows")
+            logger.info(f"  → Dropped {removed['null_customer']} rows with null CustomerID")
+            logger.info(f"  → Removed cancelled, negative/zero quantity and price rows")
+            
+            # 5. Text cleaning (after dedupe, so duplicates are judged on raw values;
+            # as category, strip/upper run once per distinct value)
+            df['Description'] = df['Description'].astype('category').str.strip().str.upper()
+            df['Country'] = df['Country'].astype('category').str.strip()
+            
+            # 6. Feature engineering
+            df['TotalAmount'] = df['Quantity'] * df['UnitPrice']
+            # Materialize the date index once and pull all calendar fields from it
+            invoice_dates = pd.DatetimeIndex(df['InvoiceDate'])
+            df[['Year', 'Month', 'Day', 'DayOfWeek', 'Hour']] = np.stack([
+                invoice_dates.year, invoice_dates.month, invoice_dates.day,
+                invoice_dates.dayofweek, invoice_dates.hour
+            ], axis=1)
+            
+            # 7. Low-cardinality text as category (chunks each carry their own
+            # categories, so this is done once after concat)
+            for column in ['Country', 'StockCode', 'Description']:
+                df[column] = df[column].astype('category')
             
-            # Drop rows without Description
-            df = df.dropna(subset=['Description'])
+            self.df_clean = df
+            self.stats['rows_after_cleaning'] = len(df)
             
-            # 3. Data type conversions
-            df['InvoiceDate'] = pd.to_datetime(df['InvoiceDate'])
-            df['CustomerID'] = df['CustomerID'].astype(int)
-            df['Quantity'] = pd.to_numeric(df['Quantity'], errors='coerce')
-            df['UnitPrice'] = pd.to_numeric(df['UnitPrice'], errors='coerce')
+            logger.info(f"✓ Transformation complete: {initial_rows:,} → {len(df):,} rows ({len(df)/initial_rows*100:.1f}% retained)")
             
-            # 4. Data quality filters
-            # Remove cancelled orders (InvoiceNo starts with 'C')
-            df = df[~df['InvoiceNo'].str.startswith('C', na=False)]
+            return True
             
-            # Remove negative quantities and prices
-            df = df[(df['Quantity'] > 0) & (df['UnitPrice'] > 0)]
-            logger.info(f"  → Removed negative/zero quantity and price rows")
+        except Exception as e:
+            logger.error(f"✗ Transformation failed: {e}")
+            self.stats['errors'].append(f"Transformation error: {e}")
+            return False
+    
+    def _cache_path(self, filepath: str) -> str:
+        """Parquet cache location for a given source CSV (keyed on its absolute path)"""
+        source = os.path.abspath(filepath)
+        stem = os.path.splitext(os.path.basename(source))[0]
+        digest = hashlib.sha1(source.encode()).hexdigest()[:12]
+        return os.path.join(CACHE_DIR, f"{stem}-{digest}.clean.parquet")
+    
+    def _source_signature(self, filepath: str) -> Dict:
+        """Identify the source CSV and cleaning logic so a stale cache is never reused"""
+        source_stat = os.stat(filepath)
+        return {
+            'source_path': os.path.abspath(filepath),
+            'source_size': source_stat.st_size,
+            'source_mtime_ns': source_stat.st_mtime_ns,
+            'cache_version': CACHE_VERSION
+        }
+    
+    def load_cached(self, filepath: str) -> bool:
+        """Load cleaned data from the Parquet cache if it was built from this exact CSV"""
+        cache_path = self._cache_path(filepath)
+        try:
+            if not os.path.exists(cache_path):
+                return False
             
-            # Remove outliers (quantity > 10000 likely data errors)
-            df = df[df['Quantity'] <= 10000]
+            # Check the signature from the footer before reading any row data
+            metadata = pq.read_schema(cache_path).metadata or {}
+            attrs = json.loads(metadata.get(b'PANDAS_ATTRS', b'{}'))
+            signature = self._source_signature(filepath)
+            if any(attrs.get(key) != value for key, value in signature.items()):
+                logger.info(f"  Cache {cache_path} is stale, re-running extract and transform")
+                return False
             
-            # 5. Feature engineering
-            df['TotalAmount'] = df['Quantity'] * df['UnitPrice']
-            df['Year'] = df['InvoiceDate'].dt.year
-            df['Month'] = df['InvoiceDate'].dt.month
-            df['Day'] = df['InvoiceDate'].dt.day
-            df['DayOfWeek'] = df['InvoiceDate'].dt.dayofweek
-            df['Hour'] = df['InvoiceDate'].dt.hour
+            df = pd.read_parquet(cache_path, engine='pyarrow')
             
-            # 6. Text cleaning
-            df['Description'] = df['Description'].str.strip().str.upper()
-            df['Country'] = df['Country'].str.strip()
+            # Parquet round-trips strings as python-backed; restore transform()'s Arrow dtypes
+            df['InvoiceNo'] = df['InvoiceNo'].astype(pd.StringDtype('pyarrow'))
+            df['StockCode'] = df['StockCode'].cat.rename_categories(
+                df['StockCode'].cat.categories.astype(pd.StringDtype('pyarrow'))
+            )
             
             self.df_clean = df
+            self.stats['rows_extracted'] = df.attrs['rows_extracted']
             self.stats['rows_after_cleaning'] = len(df)
             
-            logger.info(f"✓ Transformation complete: {initial_rows:,} → {len(df):,} rows ({len(df)/initial_rows*100:.1f}% retained)")
-            
+            logger.info(f"✓ Loaded {len(df):,} cleaned rows from cache {cache_path}")
             return True
-            
         except Exception as e:
-            logger.error(f"✗ Transformation failed: {e}")
-            self.stats['errors'].append(f"Transformation error: {e}")
+            logger.warning(f"✗ Cache read failed, re-running extract and transform: {e}")
             return False
     
+    def save_cache(self, filepath: str):
+        """Persist cleaned data as zstd-compressed Parquet for faster reruns"""
+        cache_path = self._cache_path(filepath)
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            self.df_clean.attrs.update(self._source_signature(filepath))
+            self.df_clean.attrs['rows_extracted'] = self.stats['rows_extracted']
+            self.df_clean.to_parquet(cache_path, compression='zstd', engine='pyarrow')
+            logger.info(f"✓ Cached cleaned data to {cache_path}")
+        except Exception as e:
+            # Caching is best-effort; the pipeline can continue without it
+            logger.warning(f"✗ Cache write failed: {e}")
+    
+    def _copy_upsert(self, table: str, df: pd.DataFrame, conflict_clause: str):
+        """Bulk load a DataFrame via COPY into a temp staging table, then upsert into target"""
+        columns = ', '.join(df.columns)
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        
+        # Dedicated connection so dimension loads can run concurrently
+        conn = psycopg2.connect(**self.db_config)
+        try:
+            with conn, conn.cursor() as cursor:
+                # Staging table takes column types only (no serial defaults or constraints)
+                cursor.execute(f"CREATE TEMP TABLE {table}_stg ON COMMIT DROP AS SELECT {columns} FROM {table} WITH NO DATA")
+                cursor.copy_expert(f"COPY {table}_stg ({columns}) FROM STDIN WITH CSV", buffer)
+                cursor.execute(f"""
+                    INSERT INTO {table} ({columns})
+                    SELECT {columns} FROM {table}_stg
+                    {conflict_clause}
+                """)
+        finally:
+            conn.close()
+    
+    def _load_dim_dates(self) -> int:
+        """Build and load dim_dates"""
+        logger.info("  → Loading dim_dates")
+        dates_df = pd.DataFrame()
+        dates_df['full_date'] = self.df_clean['InvoiceDate'].dt.normalize().drop_duplicates().reset_index(drop=True)
+        dates_df['year'] = dates_df['full_date'].dt.year
+        dates_df['quarter'] = dates_df['full_date'].dt.quarter
+        dates_df['month'] = dates_df['full_date'].dt.month
+        dates_df['month_name'] = dates_df['full_date'].dt.strftime('%B')
+        dates_df['week'] = dates_df['full_date'].dt.isocalendar().week
+        dates_df['day_of_month'] = dates_df['full_date'].dt.day
+        dates_df['day_of_week'] = dates_df['full_date'].dt.dayofweek
+        dates_df['day_name'] = dates_df['full_date'].dt.strftime('%A')
+        dates_df['is_weekend'] = dates_df['day_of_week'].to_numpy() >= 5  # Saturday=5, Sunday=6
+        
+        self._copy_upsert('dim_dates', dates_df, "ON CONFLICT (full_date) DO NOTHING")
+        return len(dates_df)
+    
+    def _load_dim_customers(self) -> int:
+        """Aggregate and load dim_customers"""
+        logger.info("  → Loading dim_customers")
+        customers_df = self.df_clean.groupby('CustomerID').agg({
+            'Country': 'first',
+            'InvoiceDate': ['min', 'max'],
+            'InvoiceNo': 'nunique',
+            'TotalAmount': 'sum'
+        }).reset_index()
+        
+        customers_df.columns = ['customer_id', 'country', 'first_purchase_date', 
+                               'last_purchase_date', 'total_orders', 'lifetime_value']
+        
+        self._copy_upsert('dim_customers', customers_df, """
+            ON CONFLICT (customer_id) DO UPDATE SET
+                last_purchase_date = EXCLUDED.last_purchase_date,
+                total_orders = EXCLUDED.total_orders,
+                lifetime_value = EXCLUDED.lifetime_value,
+                updated_at = CURRENT_TIMESTAMP
+        """)
+        return len(customers_df)
+    
+    def _load_dim_products(self) -> int:
+        """Aggregate and load dim_products"""
+        logger.info("  → Loading dim_products")
+        products_df = self.df_clean.groupby('StockCode', observed=True).agg({
+            'Description': 'first',
+            'UnitPrice': 'mean'  # Average price if it varies
+        }).reset_index()
+        
+        products_df.columns = ['stock_code', 'description', 'unit_price']
+        
+        self._copy_upsert('dim_products', products_df, """
+            ON CONFLICT (stock_code) DO UPDATE SET
+                description = EXCLUDED.description,
+                unit_price = EXCLUDED.unit_price
+        """)
+        return len(products_df)
+    
     def load_dimensions(self) -> bool:
         """Load dimension tables"""
         try:
             logger.info("Loading dimension tables")
-            cursor = self.conn.cursor()
-            
-            # 1. Load dim_dates
-            logger.info("  → Loading dim_dates")
-            dates_df = pd.DataFrame()
-            dates_df['full_date'] = pd.to_datetime(self.df_clean['InvoiceDate'].dt.date.unique())
-            dates_df['year'] = dates_df['full_date'].dt.year
-            dates_df['quarter'] = dates_df['full_date'].dt.quarter
-            dates_df['month'] = dates_df['full_date'].dt.month
-            dates_df['month_name'] = dates_df['full_date'].dt.strftime('%B')
-            dates_df['week'] = dates_df['full_date'].dt.isocalendar().week
-            dates_df['day_of_month'] = dates_df['full_date'].dt.day
-            dates_df['day_of_week'] = dates_df['full_date'].dt.dayofweek
-            dates_df['day_name'] = dates_df['full_date'].dt.strftime('%A')
-            dates_df['is_weekend'] = dates_df['day_of_week'].isin([5, 6])
-            
-            # Insert dates
-            for _, row in dates_df.iterrows():
-                cursor.execute("""
-                    INSERT INTO dim_dates (full_date, year, quarter, month, month_name, 
-                                          week, day_of_month, day_of_week, day_name, is_weekend)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (full_date) DO NOTHING
-                """, tuple(row))
             
-            self.conn.commit()
-            self.stats['dates_loaded'] = len(dates_df)
-            logger.info(f"    ✓ Loaded {len(dates_df)} dates")
-            
-            # 2. Load dim_customers
-            logger.info("  → Loading dim_customers")
-            customers_df = self.df_clean.groupby('CustomerID').agg({
-                'Country': 'first',
-                'InvoiceDate': ['min', 'max'],
-                'InvoiceNo': 'nunique',
-                'TotalAmount': 'sum'
-            }).reset_index()
-            
-            customers_df.columns = ['customer_id', 'country', 'first_purchase_date', 
-                                   'last_purchase_date', 'total_orders', 'lifetime_value']
-            
-            for _, row in customers_df.iterrows():
-                cursor.execute("""
-                    INSERT INTO dim_customers (customer_id, country, first_purchase_date, 
-                                              last_purchase_date, total_orders, lifetime_value)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (customer_id) DO UPDATE SET
-                        last_purchase_date = EXCLUDED.last_purchase_date,
-                        total_orders = EXCLUDED.total_orders,
-                        lifetime_value = EXCLUDED.lifetime_value,
-                        updated_at = CURRENT_TIMESTAMP
-                """, tuple(row))
-            
-            self.conn.commit()
-            self.stats['customers_loaded'] = len(customers_df)
-            logger.info(f"    ✓ Loaded {len(customers_df)} customers")
-            
-            # 3. Load dim_products
-            logger.info("  → Loading dim_products")
-            products_df = self.df_clean.groupby('StockCode').agg({
-                'Description': 'first',
-                'UnitPrice': 'mean'  # Average price if it varies
-            }).reset_index()
-            
-            for _, row in products_df.iterrows():
-                cursor.execute("""
-                    INSERT INTO dim_products (stock_code, description, unit_price)
-                    VALUES (%s, %s, %s)
-                    ON CONFLICT (stock_code) DO UPDATE SET
-                        description = EXCLUDED.description,
-                        unit_price = EXCLUDED.unit_price
-                """, tuple(row))
+            # Dimensions are independent and IO-bound, so load them concurrently
+            loaders = {
+                'dates': self._load_dim_dates,
+                'customers': self._load_dim_customers,
+                'products': self._load_dim_products
+            }
             
-            self.conn.commit()
-            self.stats['products_loaded'] = len(products_df)
-            logger.info(f"    ✓ Loaded {len(products_df)} products")
+            with ThreadPoolExecutor(max_workers=len(loaders)) as executor:
+                futures = {name: executor.submit(loader) for name, loader in loaders.items()}
+                for name, future in futures.items():
+                    rows_loaded = future.result()
+                    self.stats[f'{name}_loaded'] = rows_loaded
+                    logger.info(f"    ✓ Loaded {rows_loaded} {name}")
             
-            cursor.close()
             logger.info("✓ All dimensions loaded successfully")
             return True
             
         except Exception as e:
             logger.error(f"✗ Dimension loading failed: {e}")
-            self.conn.rollback()
             self.stats['errors'].append(f"Dimension load error: {e}")
             return False
     
@@ -251,46 +414,43 @@ class EcommerceETL:
             logger.info("Loading fact_transactions")
             cursor = self.conn.cursor()
             
-            # Prepare data with foreign keys
-            transactions = []
-            
-            for _, row in self.df_clean.iterrows():
-                # Get foreign keys
-                cursor.execute("SELECT customer_id FROM dim_customers WHERE customer_id = %s", 
-                             (int(row['CustomerID']),))
-                customer_result = cursor.fetchone()
-                
-                cursor.execute("SELECT product_id FROM dim_products WHERE stock_code = %s", 
-                             (row['StockCode'],))
-                product_result = cursor.fetchone()
-                
-                cursor.execute("SELECT date_id FROM dim_dates WHERE full_date = %s", 
-                             (row['InvoiceDate'].date(),))
-                date_result = cursor.fetchone()
-                
-                if customer_result and product_result and date_result:
-                    transactions.append((
-                        row['InvoiceNo'],
-                        customer_result[0],
-                        product_result[0],
-                        date_result[0],
-                        row['InvoiceDate'],
-                        int(row['Quantity']),
-                        float(row['UnitPrice'])
-                    ))
-            
-            # Batch insert for performance
-            insert_query = """
+            # Stream the natural keys of every cleaned row into a staging table
+            staging_df = self.df_clean[[
+                'InvoiceNo', 'CustomerID', 'StockCode', 'InvoiceDate', 'Quantity', 'UnitPrice'
+            ]]
+            buffer = io.StringIO()
+            staging_df.to_csv(buffer, index=False, header=False)
+            buffer.seek(0)
+            
+            cursor.execute("""
+                CREATE TEMP TABLE fact_transactions_stg (
+                    invoice_no VARCHAR(50),
+                    customer_id INTEGER,
+                    stock_code VARCHAR(50),
+                    invoice_date TIMESTAMP,
+                    quantity INTEGER,
+                    unit_price DECIMAL(10,2)
+                ) ON COMMIT DROP
+            """)
+            cursor.copy_expert("COPY fact_transactions_stg FROM STDIN WITH CSV", buffer)
+            
+            # Resolve foreign keys server-side; inner joins drop rows whose
+            # customer, product or date is missing
+            cursor.execute("""
                 INSERT INTO fact_transactions 
                 (invoice_no, customer_id, product_id, date_id, invoice_date, quantity, unit_price)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """
-            
-            execute_batch(cursor, insert_query, transactions, page_size=1000)
+                SELECT t.invoice_no, c.customer_id, p.product_id, d.date_id, 
+                       t.invoice_date, t.quantity, t.unit_price
+                FROM fact_transactions_stg t
+                JOIN dim_customers c ON c.customer_id = t.customer_id
+                JOIN dim_products p ON p.stock_code = t.stock_code
+                JOIN dim_dates d ON d.full_date = t.invoice_date::date
+            """)
+            transactions_loaded = cursor.rowcount
             self.conn.commit()
             
-            self.stats['transactions_loaded'] = len(transactions)
-            logger.info(f"✓ Loaded {len(transactions):,} transactions")
+            self.stats['transactions_loaded'] = transactions_loaded
+            logger.info(f"✓ Loaded {transactions_loaded:,} transactions")
             
             cursor.close()
             return True
@@ -321,28 +481,28 @@ class EcommerceETL:
             logger.info("Validating data")
             cursor = self.conn.cursor()
             
-            validation_results = {}
-            
-            # Check row counts
-            cursor.execute("SELECT COUNT(*) FROM fact_transactions")
-            validation_results['transaction_count'] = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM dim_customers")
-            validation_results['customer_count'] = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM dim_products")
-            validation_results['product_count'] = cursor.fetchone()[0]
-            
-            # Check for data quality issues
-            cursor.execute("SELECT COUNT(*) FROM fact_transactions WHERE total_amount < 0")
-            validation_results['negative_amounts'] = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT SUM(total_amount) FROM fact_transactions")
-            validation_results['total_revenue'] = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT MIN(invoice_date), MAX(invoice_date) FROM fact_transactions")
-            date_range = cursor.fetchone()
-            validation_results['date_range'] = f"{date_range[0]} to {date_range[1]}"
+            # All checks in one round trip; the fact aggregates share a single scan
+            cursor.execute("""
+                SELECT
+                    COUNT(*),
+                    (SELECT COUNT(*) FROM dim_customers),
+                    (SELECT COUNT(*) FROM dim_products),
+                    COUNT(*) FILTER (WHERE total_amount < 0),
+                    SUM(total_amount),
+                    MIN(invoice_date),
+                    MAX(invoice_date)
+                FROM fact_transactions
+            """)
+            row = cursor.fetchone()
+            
+            validation_results = {
+                'transaction_count': row[0],
+                'customer_count': row[1],
+                'product_count': row[2],
+                'negative_amounts': row[3],
+                'total_revenue': row[4],
+                'date_range': f"{row[5]} to {row[6]}"
+            }
             
             cursor.close()
             
@@ -368,7 +528,7 @@ class EcommerceETL:
             self.engine.dispose()
         logger.info("✓ Database connections closed")
     
-    def run(self, filepath: str) -> bool:
+    def run(self, filepath: str, use_cache: bool = True) -> bool:
         """Execute full ETL pipeline"""
         logger.info("="*60)
         logger.info("E-COMMERCE ETL PIPELINE STARTED")
@@ -380,11 +540,15 @@ class EcommerceETL:
             if not self.connect():
                 return False
             
-            if not self.extract(filepath):
-                return False
-            
-            if not self.transform():
-                return False
+            if not (use_cache and self.load_cached(filepath)):
+                if not self.extract(filepath):
+                    return False
+                
+                if not self.transform():
+                    return False
+                
+                if use_cache:
+                    self.save_cache(filepath)
             
             if not self.load_dimensions():
                 return False